@@ -20,6 +20,14 @@ URL_BASE = 'https://clist.by/api/v2/'
 _CLIST_API_TIME_DIFFERENCE = 30 * 60  # seconds
 
 
+_session = None
+
+
+def initialize(session):
+    global _session
+    _session = session
+
+
 class ClistApiError(commands.CommandError):
     """Base class for all API related errors."""
 
@@ -78,13 +86,13 @@ async def _query_clist_api(path, data):
         url+='&'+clist_token
     print("Calling Clist : "+url)
     try:
-        resp = requests.get(url)
-        if resp.status_code != 200:
-            if resp.status_code == 429:
-                raise CallLimitExceededError
-            else:
-                raise ClistApiError
-        return resp.json()
+        async with _session.get(url) as resp:
+            if resp.status != 200:
+                if resp.status == 429:
+                    raise CallLimitExceededError
+                else:
+                    raise ClistApiError
+            return await resp.json()
     except Exception as e:
         logger.error(f'Request to Clist API encountered error: {e!r}')
         raise ClientError from e
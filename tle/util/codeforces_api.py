@@ -2,7 +2,6 @@ import asyncio
 import logging
 import time
 import os
-import requests
 import functools
 from collections import namedtuple, deque
 
@@ -209,9 +208,9 @@ class RatingChangesUnavailableError(TrueApiError):
 _session = None
 
 
-async def initialize():
+async def initialize(session):
     global _session
-    _session = aiohttp.ClientSession()
+    _session = session
 
 
 def _bool_to_str(value):
@@ -284,10 +283,10 @@ def proxy_ratelimit(f):
 async def _query_proxy(url):
     try:
         logger.info(f'Querying RatingList from Proxy API.')
-        resp = requests.get(url)
-        if resp.status_code != 200:
-            raise CodeforcesApiError
-        resp = resp.json()
+        async with _session.get(url) as r:
+            if r.status != 200:
+                raise CodeforcesApiError
+            resp = await r.json(content_type=None)
         logger.info(f'Fetched RatingList from Proxy API.')
         return {user_dict['handle']: user_dict['rating'] for user_dict in resp}
     except Exception as e:
@@ -463,12 +462,15 @@ class user:
             if 'should contain' in e.comment:
                 raise HandleInvalidError(e.comment, handle)
             raise
-        for submission in resp:
+        # Convert in place so each submission dict can be freed as soon as it is converted; heavy
+        # users can have tens of thousands of submissions.
+        for i, submission in enumerate(resp):
             submission['problem'] = make_from_dict(Problem, submission['problem'])
             submission['author']['members'] = [make_from_dict(Member, member)
                                                for member in submission['author']['members']]
             submission['author'] = make_from_dict(Party, submission['author'])
-        return [make_from_dict(Submission, submission_dict) for submission_dict in resp]
+            resp[i] = make_from_dict(Submission, submission)
+        return resp
 
 
 async def _needs_fixing(handles):
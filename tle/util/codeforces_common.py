@@ -1,11 +1,14 @@
+import asyncio
 import functools
 import json
 import logging
 import math
+import operator
+import re
 import time
 import datetime
-from collections import defaultdict
 import itertools
+import aiohttp
 import pytz
 from disnake.ext import commands
 import disnake
@@ -28,17 +31,27 @@ cache2 = None
 # Event system
 event_sys = events.EventSystem()
 
+# HTTP session shared by the Codeforces and Clist API clients
+http_session = None
+
 _contest_id_to_writers_map = None
 
 _initialize_done = False
 
-active_groups = defaultdict(set)
+# (group, user id) pairs with a guarded command in progress
+_active_guards = set()
+
+
+def _load_json(path):
+    with open(path, 'rb') as f:
+        return json.load(f)
 
 
 async def initialize(nodb):
     global cache2
     global user_db
     global event_sys
+    global http_session
     global _contest_id_to_writers_map
     global _initialize_done
 
@@ -47,7 +60,12 @@ async def initialize(nodb):
         # when it reconnects.
         return
 
-    await cf.initialize()
+    # One long-lived session so that connections (and TLS handshakes) are reused across requests.
+    connector = aiohttp.TCPConnector(limit=100, limit_per_host=20, ttl_dns_cache=300,
+                                     keepalive_timeout=75)
+    http_session = aiohttp.ClientSession(connector=connector)
+    await cf.initialize(http_session)
+    clist.initialize(http_session)
 
     if nodb:
         user_db = db.DummyUserDbConn()
@@ -60,9 +78,9 @@ async def initialize(nodb):
     await cache2.run()
 
     try:
-        with open(constants.CONTEST_WRITERS_JSON_FILE_PATH) as f:
-            data = json.load(f)
-        _contest_id_to_writers_map = {contest['id']: [s.lower() for s in contest['writers']] for contest in data}
+        data = await asyncio.to_thread(_load_json, constants.CONTEST_WRITERS_JSON_FILE_PATH)
+        _contest_id_to_writers_map = {contest['id']: frozenset(s.lower() for s in contest['writers'])
+                                      for contest in data}
         logger.info('Contest writers loaded from JSON file')
     except FileNotFoundError:
         logger.warning('JSON file containing contest writers not found')
@@ -72,22 +90,21 @@ async def initialize(nodb):
 
 # algmyr's guard idea:
 def user_guard(*, group, get_exception=None):
-    active = active_groups[group]
-
     def guard(fun):
         @functools.wraps(fun)
         async def f(self, inter, *args, **kwargs):
             user = inter.author.id
-            if user in active:
+            key = (group, user)
+            if key in _active_guards:
                 logger.info(f'{user} repeatedly calls {group} group')
                 if get_exception is not None:
                     raise get_exception()
                 return
-            active.add(user)
+            _active_guards.add(key)
             try:
                 await fun(self, inter, *args, **kwargs)
             finally:
-                active.remove(user)
+                _active_guards.discard(key)
 
         return f
 
@@ -98,12 +115,13 @@ def is_contest_writer(contest_id, handle):
     if _contest_id_to_writers_map is None:
         return False
     writers = _contest_id_to_writers_map.get(contest_id)
-    return writers and handle.lower() in writers
+    return writers is not None and handle.lower() in writers
 
 
 _NONSTANDARD_CONTEST_INDICATORS = [
     'wild', 'fools', 'surprise', 'unknown', 'friday', 'q#', 'testing',
     'marathon', 'kotlin', 'onsite', 'experimental', 'abbyy']
+_NONSTANDARD_CONTEST_RE = re.compile('|'.join(map(re.escape, _NONSTANDARD_CONTEST_INDICATORS)))
 
 SPECIAL_COUNTRY_NAME_WORD = {
     "u.s.": "U.S.",
@@ -111,10 +129,17 @@ SPECIAL_COUNTRY_NAME_WORD = {
 }
 
 # to reformat country names
-ARTICLES = ["and", "or", "the"]
+ARTICLES = frozenset(["and", "or", "the"])
+
+# Lowercased word -> display form for words that are not simply capitalized
+_COUNTRY_NAME_WORDS = {**{article: article for article in ARTICLES}, **SPECIAL_COUNTRY_NAME_WORD}
+
+@functools.lru_cache(maxsize=8192)
+def _is_nonstandard_contest_name(name):
+    return _NONSTANDARD_CONTEST_RE.search(name.lower()) is not None
 
 def is_nonstandard_contest(contest):
-    return any(string in contest.name.lower() for string in _NONSTANDARD_CONTEST_INDICATORS)
+    return _is_nonstandard_contest_name(contest.name)
 
 def is_nonstandard_problem(problem):
     return (is_nonstandard_contest(cache2.contest_cache.get_contest(problem.contestId)) or
@@ -125,20 +150,21 @@ async def get_visited_contests(handles : [str]):
     """ Returns a set of contest ids of contests that any of the given handles
         has at least one non-CE submission.
     """
-    user_submissions = [await cf.user.status(handle=handle) for handle in handles]
+    user_submissions = await asyncio.gather(*(cf.user.status(handle=handle) for handle in handles))
     problem_to_contests = cache2.problemset_cache.problem_to_contests
+    get_contest = cache2.contest_cache.get_contest
 
-    contest_ids = []
+    contest_ids = set()
     for sub in itertools.chain.from_iterable(user_submissions):
         if sub.verdict == 'COMPILATION_ERROR':
             continue
         try:
-            contest = cache2.contest_cache.get_contest(sub.problem.contestId)
+            contest = get_contest(sub.problem.contestId)
             problem_id = (sub.problem.name, contest.startTimeSeconds)
-            contest_ids += problem_to_contests[problem_id]
+            contest_ids.update(problem_to_contests[problem_id])
         except cache_system2.ContestNotFound:
             pass
-    return set(contest_ids)
+    return contest_ids
 
 # These are special rated-for-all contests which have a combined ranklist for onsite and online
 # participants. The onsite participants have their submissions marked as out of competition. Just
@@ -227,22 +253,10 @@ def days_ago(t):
     return f'{math.floor(days)} days ago'
 
 def reformat_country_name(country):
-    country = country.lstrip().rstrip()
-    words = country.split()
-
-    for (index, word) in enumerate(words):
+    words = []
+    for word in country.split():
         word = word.lower()
-        if word in ARTICLES:
-            words[index] = word
-            continue
-
-        if word in SPECIAL_COUNTRY_NAME_WORD:
-            word = SPECIAL_COUNTRY_NAME_WORD.get(word)
-        else:
-            word = word.capitalize()
-
-        words[index] = word
-
+        words.append(_COUNTRY_NAME_WORDS.get(word) or word.capitalize())
     return " ".join(words)
 
 async def resolve_handles(inter, converter, handles, *, mincnt=1, maxcnt=5, default_to_all_server=False, resource='codeforces.com'):
@@ -273,16 +287,11 @@ async def resolve_handles(inter, converter, handles, *, mincnt=1, maxcnt=5, defa
                 role = await role_converter.convert(inter, role_identifier)
             except commands.errors.CommandError:
                 raise FindRoleFailedError(role_identifier)
-            for member in inter.guild.members:
-                if role in member.roles:
-                    if resource=='codeforces.com':
-                        handle = user_db.get_handle(member.id, inter.guild.id)
-                        if handle is not None:
-                            resolved_handles.add(handle)
-                    else:
-                        account_id = user_db.get_account_id(member.id, inter.guild.id, resource=resource)
-                        if account_id is not None:
-                            account_ids.add(account_id)
+            member_ids = [member.id for member in role.members]
+            if resource=='codeforces.com':
+                resolved_handles.update(user_db.get_handles_bulk(member_ids, inter.guild.id).values())
+            else:
+                account_ids.update(user_db.get_account_ids_bulk(member_ids, inter.guild.id, resource).values())
         elif handle.startswith('+'):
             list_name = handle[1:]
             if resource=='codeforces.com':
@@ -355,18 +364,32 @@ def negate_flags(*args):
 
 def parse_date(arg):
     try:
-        if len(arg) == 8:
-            fmt = '%d%m%Y'
-        elif len(arg) == 6:
-            fmt = '%m%Y'
-        elif len(arg) == 4:
-            fmt = '%Y'
-        else:
+        if len(arg) not in (4, 6, 8) or not (arg.isascii() and arg.isdigit()):
             raise ValueError
-        return time.mktime(datetime.datetime.strptime(arg, fmt).timetuple())
+        # Slice the fields directly rather than going through strptime.
+        day = int(arg[:2]) if len(arg) == 8 else 1
+        month = int(arg[-6:-4]) if len(arg) >= 6 else 1
+        return time.mktime(datetime.datetime(int(arg[-4:]), month, day).timetuple())
     except ValueError:
         raise ParamParseError(f'{arg} is an invalid date argument')
 
+def _tag_matcher(query_tags):
+    """Returns a function mapping a problem's tags to a bitmask with bit i set if query_tags[i] is a
+    substring of any of them, the same matching as Problem.tag_matches. Masks are memoized per tag."""
+    tag_masks = {}
+
+    def matched_bits(problem_tags):
+        bits = 0
+        for tag in problem_tags:
+            mask = tag_masks.get(tag)
+            if mask is None:
+                mask = tag_masks[tag] = sum(1 << i for i, query_tag in enumerate(query_tags)
+                                            if query_tag in tag)
+            bits |= mask
+        return bits
+
+    return matched_bits
+
 class SubFilter:
     def __init__(self, rated=True):
         self.team = False
@@ -429,43 +452,72 @@ class SubFilter:
         """Filters and keeps only solved submissions. If a problem is solved multiple times the first
         accepted submission is kept. The unique id for a problem is (problem name, contest start time).
         """
-        submissions.sort(key=lambda sub: sub.creationTimeSeconds)
-        problems = set()
-        solved_subs = []
-
+        first_solves = {}
         for submission in submissions:
+            if submission.verdict != 'OK':
+                continue
             problem = submission.problem
             contest = cache2.contest_cache.contest_by_id.get(problem.contestId, None)
-            if submission.verdict == 'OK':
-                # Assume (name, contest start time) is a unique identifier for problems
-                problem_key = (problem.name, contest.startTimeSeconds if contest else 0)
-                if problem_key not in problems:
-                    solved_subs.append(submission)
-                    problems.add(problem_key)
-        return solved_subs
+            # Assume (name, contest start time) is a unique identifier for problems
+            problem_key = (problem.name, contest.startTimeSeconds if contest else 0)
+            first = first_solves.get(problem_key)
+            if first is None or submission.creationTimeSeconds < first.creationTimeSeconds:
+                first_solves[problem_key] = submission
+        # Only the solved subset is sorted, to keep returning submissions in chronological order.
+        return sorted(first_solves.values(), key=lambda sub: sub.creationTimeSeconds)
 
     def filter_subs(self, submissions):
         submissions = SubFilter.filter_solved(submissions)
+        # Bind everything the loop reads to locals; it runs once per solved submission.
+        types = frozenset(self.types)
+        dlo, dhi, rlo, rhi = self.dlo, self.dhi, self.rlo, self.rhi
+        rated, team = self.rated, self.team
+        tags, notags, contests = self.tags, self.notags, self.contests
+        tag_bits, notag_bits = _tag_matcher(tags), _tag_matcher(notags)
+        all_tags_mask = (1 << len(tags)) - 1
+        indices = [index.lower() for index in self.indices]
+        gym_id_threshold = cf.GYM_ID_THRESHOLD
+        get_contest = cache2.contest_cache.contest_by_id.get
+        project = operator.attrgetter('author.participantType', 'creationTimeSeconds', 'problem',
+                                      'author.members')
+        nonstandard_contests = {}
+
+        def is_nonstandard(problem, contest):
+            # Same as is_nonstandard_problem, but with the contest name check done once per contest.
+            nonstandard = nonstandard_contests.get(contest.id)
+            if nonstandard is None:
+                nonstandard = nonstandard_contests[contest.id] = is_nonstandard_contest(contest)
+            return nonstandard or problem.tag_matches(['*special'])
+
         filtered_subs = []
         for submission in submissions:
-            problem = submission.problem
-            contest = cache2.contest_cache.contest_by_id.get(problem.contestId, None)
-            type_ok = submission.author.participantType in self.types
-            date_ok = self.dlo <= submission.creationTimeSeconds < self.dhi
-            tag_ok = not self.tags or problem.tag_matches(self.tags)
-            notag_ok = not self.notags or problem.tag_matches_or(self.notags) == None
-            index_ok = not self.indices or any(index.lower() == problem.index.lower() for index in self.indices)
-            contest_ok = not self.contests or (contest and contest.matches(self.contests))
-            team_ok = self.team or len(submission.author.members) == 1
-            if self.rated:
-                problem_ok = contest and contest.id < cf.GYM_ID_THRESHOLD and not is_nonstandard_problem(problem)
-                rating_ok = problem.rating and self.rlo <= problem.rating <= self.rhi
+            participant_type, creation_time, problem, members = project(submission)
+            # Cheap scalar checks first, so that the tag, contest and nonstandard checks below only
+            # run for submissions that can still pass.
+            if participant_type not in types:
+                continue
+            if not dlo <= creation_time < dhi:
+                continue
+            if rated and not (problem.rating and rlo <= problem.rating <= rhi):
+                continue
+            if not team and len(members) != 1:
+                continue
+            if indices and problem.index.lower() not in indices:
+                continue
+            if tags and tag_bits(problem.tags) != all_tags_mask:
+                continue
+            if notags and notag_bits(problem.tags):
+                continue
+            contest = get_contest(problem.contestId)
+            if contests and not (contest and contest.matches(contests)):
+                continue
+            if rated:
+                problem_ok = contest and contest.id < gym_id_threshold and not is_nonstandard(problem, contest)
             else:
                 # acmsguru and gym allowed
-                problem_ok = (not contest or contest.id >= cf.GYM_ID_THRESHOLD
-                              or not is_nonstandard_problem(problem))
-                rating_ok = True
-            if type_ok and date_ok and rating_ok and tag_ok and notag_ok and team_ok and problem_ok and contest_ok and index_ok:
+                problem_ok = (not contest or contest.id >= gym_id_threshold
+                              or not is_nonstandard(problem, contest))
+            if problem_ok:
                 filtered_subs.append(submission)
         return filtered_subs
 
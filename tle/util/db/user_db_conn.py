@@ -70,6 +70,10 @@ class UserDbConn:
         self.conn = sqlite3.connect(dbfile)
         self.conn.row_factory = namedtuple_factory
         self.create_tables()
+        # (user_id, guild_id) -> handle and (user_id, guild_id, resource) -> account_id lookups,
+        # invalidated by every method that writes to the underlying tables.
+        self._handle_cache = {}
+        self._account_id_cache = {}
     
     # update the data in firebase
     def update(self):
@@ -390,6 +394,7 @@ class UserDbConn:
         res = None
         with self.conn:
             res = self.conn.execute(query, (user_id, guild_id, handle)).rowcount
+        self._handle_cache.pop((str(user_id), str(guild_id)), None)
         self.update()
         return res
 
@@ -407,6 +412,7 @@ class UserDbConn:
         res = None
         with self.conn:
             res = self.conn.execute(query, (guild_id, account_id, user_id, resource,handle)).rowcount
+        self._account_id_cache.pop((str(user_id), str(guild_id), resource), None)
         self.update()
         return res
 
@@ -421,18 +427,54 @@ class UserDbConn:
         return res
 
     def get_handle(self, user_id, guild_id):
+        key = (str(user_id), str(guild_id))
+        if key in self._handle_cache:
+            return self._handle_cache[key]
         query = ('SELECT handle '
                  'FROM user_handle '
                  'WHERE user_id = ? AND guild_id = ?')
         res = self.conn.execute(query, (user_id, guild_id)).fetchone()
-        return res[0] if res else None
+        handle = self._handle_cache[key] = res[0] if res else None
+        return handle
+
+    def get_handles_bulk(self, user_ids, guild_id):
+        query = ('SELECT user_id, handle '
+                 'FROM user_handle '
+                 'WHERE guild_id = ? AND user_id IN ({})')
+        user_ids = [str(user_id) for user_id in user_ids]
+        handles = {}
+        # Chunked to stay below SQLite's limit on the number of host parameters.
+        for i in range(0, len(user_ids), 900):
+            chunk = user_ids[i:i + 900]
+            placeholders = ', '.join(['?'] * len(chunk))
+            res = self.conn.execute(query.format(placeholders), (guild_id, *chunk)).fetchall()
+            handles.update((int(user_id), handle) for user_id, handle in res)
+        return handles
 
     def get_account_id(self, user_id, guild_id, resource):
+        key = (str(user_id), str(guild_id), resource)
+        if key in self._account_id_cache:
+            return self._account_id_cache[key]
         query = ('SELECT account_id '
                  'FROM clist_account_ids '
                  'WHERE user_id = ? AND guild_id = ? AND resource = ?')
         res = self.conn.execute(query, (user_id, guild_id, resource)).fetchone()
-        return res[0] if res else None
+        account_id = self._account_id_cache[key] = res[0] if res else None
+        return account_id
+
+    def get_account_ids_bulk(self, user_ids, guild_id, resource):
+        query = ('SELECT user_id, account_id '
+                 'FROM clist_account_ids '
+                 'WHERE guild_id = ? AND resource = ? AND user_id IN ({})')
+        user_ids = [str(user_id) for user_id in user_ids]
+        account_ids = {}
+        # Chunked to stay below SQLite's limit on the number of host parameters.
+        for i in range(0, len(user_ids), 900):
+            chunk = user_ids[i:i + 900]
+            placeholders = ', '.join(['?'] * len(chunk))
+            res = self.conn.execute(query.format(placeholders), (guild_id, resource, *chunk)).fetchall()
+            account_ids.update((int(user_id), account_id) for user_id, account_id in res)
+        return account_ids
 
     def get_all_handles(self, guild_id):
         query = ('SELECT handle '
@@ -481,6 +523,9 @@ class UserDbConn:
         res2 = None
         with self.conn:
             res2 = self.conn.execute(query, (user_id, guild_id)).rowcount
+        self._handle_cache.pop((str(user_id), str(guild_id)), None)
+        self._account_id_cache = {key: value for key, value in self._account_id_cache.items()
+                                  if key[:2] != (str(user_id), str(guild_id))}
         self.update()
         return res1 or res2
 
@@ -491,6 +536,8 @@ class UserDbConn:
         query = ('DELETE FROM clist_account_ids '
                  'WHERE guild_id = ?')
         self.conn.execute(query, (guild_id,))
+        self._handle_cache.clear()
+        self._account_id_cache.clear()
         self.clear_reminder_settings(guild_id)
         self.clear_rankup_channel(guild_id)
         self.update()